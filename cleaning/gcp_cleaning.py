@@ -17,8 +17,10 @@ class GCPCleaner:
         df = clean_func(df)
         return df
 
-    def load_into_bigquery(self, df: pd.DataFrame, destination_table: str):
-        to_gbq(df, destination_table=destination_table, project_id=self.project_id, if_exists="replace")
+    def load_into_bigquery(self, df: pd.DataFrame, destination_table: str, table_schema: list = None):
+        # table_schema overrides the column types pandas-gbq infers, e.g. DATE for dbdate columns
+        schema_kwargs = {"table_schema": table_schema} if table_schema else {}
+        to_gbq(df, destination_table=destination_table, project_id=self.project_id, if_exists="replace", **schema_kwargs)
 
     def run(self, source_table: str, destination_table: str, clean_func=None):
         df = self.load_from_bigquery(source_table)
@@ -0,0 +1,166 @@
+import datetime
+from pathlib import Path
+
+import db_dtypes  # noqa: F401 registers the dbdate dtype
+import pandas as pd
+from google.api_core.exceptions import NotFound
+
+from cleaning.gcp_cleaning import GCPCleaner
+
+
+class SalesRollups(GCPCleaner):
+    """
+    Materialized aggregates for the exo.sql queries, updated incrementally by date watermark:
+        - daily_sales: date, ventes
+        - client_sales: client_id, ventes_meuble, ventes_deco
+
+    client_sales only folds in the transactions within the exo 2 date bounds, as it has no date dimension.
+    Each rollup keeps its own watermark (the last transaction date folded in): daily_sales uses its last
+    date, client_sales a one-row client_sales_watermark table, so the watermark survives an empty rollup.
+    The watermark table is written right after client_sales: a failure between the two writes folds that
+    batch again on the next run. Transactions are assumed to be ingested by whole days.
+    """
+
+    DAILY_COLUMNS = ["date", "ventes"]
+    CLIENT_COLUMNS = ["client_id", "ventes_meuble", "ventes_deco"]
+    DATE_COLUMNS = ["date", "watermark"]
+    # exo 2: date BETWEEN '2019-01-01' AND '2030-12-31'
+    CLIENT_SALES_START = datetime.date(2019, 1, 1)
+    CLIENT_SALES_END = datetime.date(2030, 12, 31)
+
+    def __init__(self, project_id: str, dataset_id: str = "servier_test"):
+        super().__init__(project_id)
+        self.dataset_id = dataset_id
+
+    def table(self, name: str) -> str:
+        return f"{self.dataset_id}.{name}"
+
+    def load_new_transactions(self, watermark) -> pd.DataFrame:
+        query = f"SELECT * FROM `{self.table('transaction')}`"
+        if watermark is not None:
+            query += f" WHERE date > '{watermark}'"
+        return self.bigquery_client.query(query).to_dataframe()
+
+    def load_rollup(self, name: str) -> pd.DataFrame:
+        try:
+            return self.load_from_bigquery(self.table(name))
+        except (NotFound, FileNotFoundError):
+            return None
+
+    def run(self, full_refresh: bool = False):
+        """
+        Folds the transactions newer than each rollup watermark into the stored rollups.
+
+        Args:
+            full_refresh (bool): Ignore the stored rollups and recompute them from every transaction.
+
+        Returns:
+            tuple: The (daily_sales, client_sales) DataFrames as stored.
+        """
+        daily = None if full_refresh else self.load_rollup("daily_sales")
+        clients = None if full_refresh else self.load_rollup("client_sales")
+        daily_watermark = self.watermark(daily, "date")
+        clients_watermark = None if full_refresh else self.watermark(self.load_rollup("client_sales_watermark"), "watermark")
+
+        watermarks = [daily_watermark, clients_watermark]
+        transactions = self.load_new_transactions(None if None in watermarks else min(watermarks))
+        transactions["date"] = self.to_date(transactions["date"])
+        daily = pd.DataFrame(columns=self.DAILY_COLUMNS) if daily is None else daily
+        daily["date"] = self.to_date(daily["date"])
+        clients = pd.DataFrame(columns=self.CLIENT_COLUMNS) if clients is None else clients
+
+        # A full refresh always stores its rollups, even empty ones, so no stale table is left behind
+        new_daily = self.after(transactions, daily_watermark)
+        if full_refresh or not new_daily.empty:
+            daily = self.merge_rollups(daily, self.daily_sales(new_daily), ["date"])
+            self.store_rollup(daily, "daily_sales")
+
+        new_clients = self.after(transactions, clients_watermark)
+        if full_refresh or not new_clients.empty:
+            products = self.load_from_bigquery(self.table("product"))
+            clients = self.merge_rollups(clients, self.client_sales(new_clients, products), ["client_id"])
+            self.store_rollup(clients, "client_sales")
+            self.store_rollup(pd.DataFrame({"watermark": [new_clients["date"].max()]}).dropna(), "client_sales_watermark")
+        return daily, clients
+
+    def store_rollup(self, df: pd.DataFrame, name: str):
+        # pandas-gbq types object columns as STRING: dates go as dbdate into DATE columns
+        date_columns = [column for column in self.DATE_COLUMNS if column in df.columns]
+        self.load_into_bigquery(
+            df.astype({column: "dbdate" for column in date_columns}),
+            self.table(name),
+            [{"name": column, "type": "DATE"} for column in date_columns],
+        )
+
+    @classmethod
+    def to_date(cls, dates: pd.Series) -> pd.Series:
+        return pd.to_datetime(dates).dt.date
+
+    @classmethod
+    def watermark(cls, rollup: pd.DataFrame, date_column: str):
+        if rollup is None or rollup.empty:
+            return None
+        return cls.to_date(rollup[date_column]).max()
+
+    @classmethod
+    def after(cls, transactions: pd.DataFrame, watermark) -> pd.DataFrame:
+        if watermark is None:
+            return transactions
+        return transactions[transactions["date"] > watermark]
+
+    @classmethod
+    def daily_sales(cls, transactions: pd.DataFrame) -> pd.DataFrame:
+        """Reference implementation of exo 1, without the date filter."""
+        sales = transactions.assign(ventes=transactions["prod_price"] * transactions["prod_qty"])
+        return sales.groupby("date", as_index=False)["ventes"].sum()
+
+    @classmethod
+    def client_sales(cls, transactions: pd.DataFrame, products: pd.DataFrame) -> pd.DataFrame:
+        """Reference implementation of exo 2: the date bounds, the product LEFT JOIN and the MEUBLE/DECO split."""
+        transactions = transactions[transactions["date"].between(cls.CLIENT_SALES_START, cls.CLIENT_SALES_END)]
+        transa_product = transactions.merge(
+            products[["product_id", "product_type"]], how="left", left_on="prod_id", right_on="product_id"
+        )
+        ventes = transa_product["prod_price"] * transa_product["prod_qty"]
+        transa_product["ventes_meuble"] = ventes.where(transa_product["product_type"] == "MEUBLE", 0)
+        transa_product["ventes_deco"] = ventes.where(transa_product["product_type"] == "DECO", 0)
+        return transa_product.groupby("client_id", as_index=False)[["ventes_meuble", "ventes_deco"]].sum()
+
+    @classmethod
+    def merge_rollups(cls, rollup: pd.DataFrame, delta: pd.DataFrame, keys: list) -> pd.DataFrame:
+        if rollup.empty:
+            return delta.sort_values(keys, ignore_index=True)
+        return pd.concat([rollup, delta]).groupby(keys, as_index=False).sum().sort_values(keys, ignore_index=True)
+
+
+class LocalSalesRollups(SalesRollups):
+    """
+    Same rollups over CSV files of a local directory (transaction.csv, product.csv with ISO dates),
+    to verify and benchmark the incremental results without a warehouse.
+    """
+
+    def __init__(self, data_dir: str):
+        self.data_dir = Path(data_dir)
+
+    def table(self, name: str) -> str:
+        return str(self.data_dir / f"{name}.csv")
+
+    def load_from_bigquery(self, source_table: str) -> pd.DataFrame:
+        if not Path(source_table).exists():
+            raise FileNotFoundError(f"{source_table} not found")
+        return pd.read_csv(source_table)
+
+    def load_into_bigquery(self, df: pd.DataFrame, destination_table: str, table_schema: list = None):
+        df.to_csv(destination_table, index=False)
+
+    def load_new_transactions(self, watermark) -> pd.DataFrame:
+        transactions = self.load_from_bigquery(self.table("transaction"))
+        transactions["date"] = self.to_date(transactions["date"])
+        return self.after(transactions, watermark)
+
+
+if __name__ == "__main__":
+    project_id = "sandbox-nbrami-sfeir"
+    daily, clients = SalesRollups(project_id).run()
+    print("daily_sales:", daily)
+    print("client_sales:", clients)
@@ -0,0 +1,205 @@
+import hashlib
+import heapq
+import logging
+import os
+import sys
+from array import array
+from bisect import bisect_left
+from functools import lru_cache
+from pathlib import Path
+from typing import Iterable, Iterator
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+
+class SortedHashStore:
+    """Persistent seen-set stored on disk as a sorted file of 64-bit hashes."""
+
+    def __init__(self, path: str = None):
+        self.path = Path(path) if path else None
+        self.hashes = self._read()
+
+    def __contains__(self, record_hash: int) -> bool:
+        index = bisect_left(self.hashes, record_hash)
+        return index < len(self.hashes) and self.hashes[index] == record_hash
+
+    def __len__(self) -> int:
+        return len(self.hashes)
+
+    def _read(self) -> array:
+        hashes = array("Q")
+        if self.path and self.path.exists():
+            with open(self.path, "rb") as hash_file:
+                hashes.frombytes(hash_file.read())
+            if sys.byteorder == "little":
+                hashes.byteswap()
+            logger.info(f"Loaded {len(hashes)} known hashes from {self.path}")
+        return hashes
+
+    def add_all(self, new_hashes: Iterable[int]):
+        """
+        Merges new hashes into the sorted store and persists it atomically.
+
+        Args:
+            new_hashes (Iterable[int]): Hashes to add, in any order.
+        """
+        merged = array("Q")
+        previous = None
+        for record_hash in heapq.merge(self.hashes, sorted(new_hashes)):
+            if record_hash != previous:
+                merged.append(record_hash)
+                previous = record_hash
+        self.hashes = merged
+        if self.path:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            to_write = array("Q", merged)
+            if sys.byteorder == "little":
+                to_write.byteswap()
+            tmp_path = self.path.with_suffix(self.path.suffix + ".tmp")
+            with open(tmp_path, "wb") as hash_file:
+                to_write.tofile(hash_file)
+            os.replace(tmp_path, self.path)
+            logger.info(f"Persisted {len(merged)} hashes to {self.path}")
+
+
+class PublicationDeduplicator:
+    """
+    Drops empty titles and duplicate (title, journal, date, id) publications.
+
+    An empty journal or id acts as a wildcard: a row missing one of them is a duplicate of any
+    row with the same title and date, e.g. the repeated trial of clinical_trials.csv. A complete
+    row is never dropped because of an incomplete one, and `deduplicate` fills the empty journal or
+    id of a kept row from the incomplete duplicates it drops, so no information is lost.
+    """
+
+    def __init__(self, seen_path: str = None, title_column: str = "title"):
+        self.title_column = title_column
+        self.key_columns = (title_column, "journal", "date", "id")
+        self.store = SortedHashStore(seen_path)
+        self.pending = set()
+
+    @classmethod
+    def normalize_value(cls, value) -> str:
+        if value is None or (not isinstance(value, str) and pd.isna(value)):
+            return ""
+        if isinstance(value, float) and value.is_integer():
+            value = int(value)
+        return " ".join(str(value).lower().split())
+
+    @classmethod
+    @lru_cache(maxsize=4096)
+    def normalize_date(cls, value) -> str:
+        date = cls.normalize_value(value)
+        if not date:
+            return date
+        try:
+            return pd.to_datetime(date, dayfirst=True).strftime("%Y-%m-%d")
+        except (ValueError, OverflowError):
+            return date
+
+    def normalize_record(self, record: dict) -> tuple:
+        title, journal, date, record_id = (record.get(column) for column in self.key_columns)
+        return (
+            self.normalize_value(title),
+            self.normalize_value(journal),
+            self.normalize_date(date),
+            self.normalize_value(record_id),
+        )
+
+    @classmethod
+    def hash_record(cls, normalized_record: tuple) -> int:
+        digest = hashlib.blake2b("\x1f".join(normalized_record).encode("utf-8"), digest_size=8).digest()
+        return int.from_bytes(digest, "big")
+
+    def iter_unique(self, records: Iterable[dict]) -> Iterator[dict]:
+        """
+        Streams records, yielding only non-empty titles not seen in this or a previous run.
+
+        Args:
+            records (Iterable[dict]): Records containing the title, journal, date and id columns.
+
+        Yields:
+            dict: The first occurrence of each publication.
+        """
+        for record in records:
+            if self._is_new(*self.normalize_record(record)):
+                yield record
+
+    def deduplicate(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Removes empty titles and already seen publications from a DataFrame.
+
+        Args:
+            df (pd.DataFrame): The DataFrame to deduplicate.
+
+        Returns:
+            pd.DataFrame: The deduplicated DataFrame, with the original columns and dtypes.
+        """
+        keys = df.reindex(columns=list(self.key_columns))
+        # Dates repeat a lot across rows: parse each distinct value once
+        codes, unique_dates = pd.factorize(keys[self.key_columns[2]])
+        normalized_dates = [self.normalize_date(date) for date in unique_dates] + [""]
+        keys[self.key_columns[2]] = [normalized_dates[code] for code in codes]
+        rows = [
+            (self.normalize_value(title), self.normalize_value(journal), date, self.normalize_value(record_id))
+            for title, journal, date, record_id in keys.itertuples(index=False, name=None)
+        ]
+
+        df = df.copy()
+        mask = [False] * len(rows)
+        kept_positions = {}
+        # Complete rows go first so they win over an incomplete duplicate appearing earlier in the file
+        for position in sorted(range(len(rows)), key=lambda position: self._is_incomplete(*rows[position])):
+            title, journal, date, record_id = rows[position]
+            title_date_hash = self._title_date_hash(title, date)
+            if self._is_new(*rows[position]):
+                mask[position] = True
+                kept_positions.setdefault(title_date_hash, position)
+            elif title_date_hash in kept_positions:
+                self._fill_missing(df, rows, kept_positions[title_date_hash], position)
+        logger.info(f"Deduplication kept {sum(mask)} of {len(df)} rows.")
+        return df[pd.Series(mask, index=df.index, dtype=bool)].reset_index(drop=True)
+
+    def _fill_missing(self, df: pd.DataFrame, rows: list, kept: int, dropped: int):
+        """Copies the journal and id of a dropped duplicate into the kept row when it has none."""
+        kept_title, kept_journal, kept_date, kept_id = rows[kept]
+        _, dropped_journal, _, dropped_id = rows[dropped]
+        for column, kept_value, dropped_value in (("journal", kept_journal, dropped_journal), ("id", kept_id, dropped_id)):
+            if not kept_value and dropped_value and column in df.columns:
+                df.iloc[kept, df.columns.get_loc(column)] = df.iloc[dropped, df.columns.get_loc(column)]
+        rows[kept] = (kept_title, kept_journal or dropped_journal, kept_date, kept_id or dropped_id)
+        self.pending.add(self.hash_record(rows[kept]))
+
+    def _seen(self, record_hash: int) -> bool:
+        return record_hash in self.pending or record_hash in self.store
+
+    @classmethod
+    def _is_incomplete(cls, title: str, journal: str, date: str, record_id: str) -> bool:
+        return not journal or not record_id
+
+    def _title_date_hash(self, title: str, date: str) -> int:
+        # The tagged 3-field hash shares the store with the 4-field record hashes without colliding
+        return self.hash_record(("title_date", title, date))
+
+    def _is_new(self, title: str, journal: str, date: str, record_id: str) -> bool:
+        if not title:
+            return False
+        record_hash = self.hash_record((title, journal, date, record_id))
+        title_date_hash = self._title_date_hash(title, date)
+        if self._seen(record_hash):
+            return False
+        if self._is_incomplete(title, journal, date, record_id) and self._seen(title_date_hash):
+            return False
+        self.pending.update((record_hash, title_date_hash))
+        return True
+
+    def commit(self):
+        """Persists the hashes seen since the last commit, once the rows are safely loaded."""
+        self.store.add_all(self.pending)
+        self.pending = set()
+
+    def rollback(self):
+        """Forgets the hashes seen since the last commit, so a failed load can be retried."""
+        self.pending = set()
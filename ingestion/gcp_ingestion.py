@@ -176,7 +176,7 @@ class GCPIngestionPandas(GCPIngestion):
             logger.error(f"Error downloading blob {blob_path} from bucket {bucket_name}: {e}")
             raise
 
-    def run(self, full_bucket_path: str, dataset_id: str, clean_func=None):
+    def run(self, full_bucket_path: str, dataset_id: str, clean_func=None, deduplicator=None):
         """
         Executes the complete ingestion process using pandas-gbq.
 
@@ -184,6 +184,8 @@ class GCPIngestionPandas(GCPIngestion):
             full_bucket_path (str): Full path of the file inside the bucket (e.g., "bucket-name/folder/file.csv").
             dataset_id (str): The dataset ID in BigQuery where the data should be loaded.
             clean_func (function, optional): A cleaning function to apply to the DataFrame.
+            deduplicator (PublicationDeduplicator, optional): Drops empty titles and publications
+                already ingested, its seen-set is committed once the load succeeds.
 
         Raises:
             FileNotFoundError: If the file or bucket does not exist.
@@ -201,8 +203,14 @@ class GCPIngestionPandas(GCPIngestion):
             if clean_func:
                 df = clean_func(df)
 
+            # Drop empty titles and publications already seen in this or a previous run
+            if deduplicator:
+                df = deduplicator.deduplicate(df)
+
             # Load data into BigQuery
             self.load_into_bigquery(df, dataset_id, table_id)
+            if deduplicator:
+                deduplicator.commit()
 
             # Step 5: Archive or handle the file as needed (e.g., move to another bucket)
             archive_bucket_name = f"{bucket_name}-archive"
@@ -210,6 +218,8 @@ class GCPIngestionPandas(GCPIngestion):
 
         except Exception as e:
             logger.error(f"Error during ingestion execution: {e}")
+            if deduplicator:
+                deduplicator.rollback()
             # Handle error case, move file to error bucket if necessary
             error_bucket_name = f"{bucket_name}-errors"
             try:
@@ -0,0 +1,342 @@
+import argparse
+import json
+import logging
+import mmap
+import os
+import struct
+from bisect import bisect_left, bisect_right
+from datetime import datetime
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, unquote, urlparse
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+MAGIC = b"DRUGIDX1"
+# magic, n_drugs, n_journals, n_mentions, directory, journals, mentions and strings offsets
+HEADER = struct.Struct("<8sIIIQQQQ")
+# key offset in the strings blob, key length, first mention, mention count
+DRUG_ENTRY = struct.Struct("<QIII")
+# name offset in the strings blob, name length
+JOURNAL_ENTRY = struct.Struct("<QI")
+# date as yyyymmdd, source code, journal id
+MENTION = struct.Struct("<IBI")
+SOURCES = ("", "clinical", "pubmed")
+DATE_FORMAT = "%m-%d-%Y"
+
+
+class DrugIndex:
+    """
+    Read-only drug lookup over a memory-mapped index built from `SearchDrugs.run` output.
+
+    The file holds the drug keys sorted, each pointing to a block of mentions sorted by date,
+    so opening it only maps the file and lookups touch the pages they need.
+    """
+
+    def __init__(self, index_path: str, cache_size: int = 1024):
+        self.index_path = Path(index_path)
+        with open(self.index_path, "rb") as index_file:
+            self.mm = mmap.mmap(index_file.fileno(), 0, access=mmap.ACCESS_READ)
+        (
+            magic,
+            self.n_drugs,
+            self.n_journals,
+            self.n_mentions,
+            self.directory_offset,
+            self.journals_offset,
+            self.mentions_offset,
+            self.strings_offset,
+        ) = HEADER.unpack_from(self.mm, 0)
+        if magic != MAGIC:
+            self.mm.close()
+            raise ValueError(f"{index_path} is not a drug index file")
+        # Hot drugs are served from memory without touching the mapped blocks again
+        self._cached_mentions = lru_cache(maxsize=cache_size)(self._mentions)
+
+    def __len__(self) -> int:
+        return self.n_drugs
+
+    def close(self):
+        self.mm.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @classmethod
+    def build(cls, drug_mentions: dict, index_path: str):
+        """
+        Writes the index file atomically.
+
+        Args:
+            drug_mentions (dict): Drug name -> iterable of (source, journal, date) tuples,
+                dates formatted as "%m-%d-%Y" like the cleaned staging tables.
+            index_path (str): Path of the index file to write.
+        """
+        journal_ids = {}
+        journal_entries = bytearray()
+        drug_entries = bytearray()
+        mentions = bytearray()
+        strings = bytearray()
+
+        def add_string(value: str) -> tuple:
+            encoded = value.encode("utf-8")
+            offset = len(strings)
+            strings.extend(encoded)
+            return offset, len(encoded)
+
+        n_mentions = 0
+        for drug in sorted(drug_mentions, key=lambda name: name.encode("utf-8")):
+            drug_rows = sorted(
+                {
+                    (cls.encode_date(date), SOURCES.index(cls.text(source)), cls.text(journal))
+                    for source, journal, date in drug_mentions[drug]
+                }
+            )
+            for date, source, journal in drug_rows:
+                if journal not in journal_ids:
+                    journal_ids[journal] = len(journal_ids)
+                    journal_entries.extend(JOURNAL_ENTRY.pack(*add_string(journal)))
+                mentions.extend(MENTION.pack(date, source, journal_ids[journal]))
+            drug_entries.extend(DRUG_ENTRY.pack(*add_string(drug), n_mentions, len(drug_rows)))
+            n_mentions += len(drug_rows)
+
+        directory_offset = HEADER.size
+        journals_offset = directory_offset + len(drug_entries)
+        mentions_offset = journals_offset + len(journal_entries)
+        strings_offset = mentions_offset + len(mentions)
+        header = HEADER.pack(
+            MAGIC,
+            len(drug_mentions),
+            len(journal_ids),
+            n_mentions,
+            directory_offset,
+            journals_offset,
+            mentions_offset,
+            strings_offset,
+        )
+
+        index_path = Path(index_path)
+        index_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = index_path.with_suffix(index_path.suffix + ".tmp")
+        with open(tmp_path, "wb") as index_file:
+            for chunk in (header, drug_entries, journal_entries, mentions, strings):
+                index_file.write(chunk)
+        os.replace(tmp_path, index_path)
+        logger.info(f"Drug index written to {index_path}: {len(drug_mentions)} drugs, {n_mentions} mentions")
+
+    @classmethod
+    def mentions_from_search_results(cls, drug_data: list) -> dict:
+        """Converts `SearchDrugs.run` output ([{drug: {(source, journal, date), ...}}, ...])."""
+        drug_mentions = {}
+        for entry in drug_data:
+            for drug, journal_entries in entry.items():
+                drug_mentions.setdefault(drug, set()).update(journal_entries)
+        return drug_mentions
+
+    @classmethod
+    def mentions_from_json_file(cls, json_path: str) -> dict:
+        """Converts the `drug_json_result.json` format, which does not keep the source."""
+        with open(json_path) as json_file:
+            drug_json = json.load(json_file)
+        return {
+            entry["drug"]: {("", journal["name_journal"], journal["date"]) for journal in entry["journals"]}
+            for entry in drug_json
+        }
+
+    @classmethod
+    def text(cls, value) -> str:
+        """Missing values (None, NaN from the staging tables) become empty strings."""
+        return value if isinstance(value, str) else ""
+
+    @classmethod
+    def encode_date(cls, date: str) -> int:
+        try:
+            return int(datetime.strptime(date, DATE_FORMAT).strftime("%Y%m%d"))
+        except (TypeError, ValueError):
+            return 0
+
+    @classmethod
+    def decode_date(cls, date: int) -> str:
+        if not date:
+            return ""
+        return datetime.strptime(str(date), "%Y%m%d").strftime(DATE_FORMAT)
+
+    @classmethod
+    def parse_bound(cls, date: str) -> int:
+        """Parses an ISO (YYYY-MM-DD) date-range bound."""
+        return int(datetime.strptime(date, "%Y-%m-%d").strftime("%Y%m%d"))
+
+    def _string(self, offset: int, length: int) -> str:
+        start = self.strings_offset + offset
+        return self.mm[start : start + length].decode("utf-8")
+
+    def _drug_entry(self, position: int) -> tuple:
+        return DRUG_ENTRY.unpack_from(self.mm, self.directory_offset + position * DRUG_ENTRY.size)
+
+    def _key(self, position: int) -> bytes:
+        key_offset, key_length, _, _ = self._drug_entry(position)
+        start = self.strings_offset + key_offset
+        return self.mm[start : start + key_length]
+
+    def _journal(self, journal_id: int) -> str:
+        return self._string(*JOURNAL_ENTRY.unpack_from(self.mm, self.journals_offset + journal_id * JOURNAL_ENTRY.size))
+
+    def _find(self, key: bytes) -> int:
+        """Position of the first drug key >= key (bisect_left by hand, without the 3.10+ `key=`)."""
+        low, high = 0, self.n_drugs
+        while low < high:
+            middle = (low + high) // 2
+            if self._key(middle) < key:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def _mentions(self, drug: str):
+        key = drug.encode("utf-8")
+        position = self._find(key)
+        if position == self.n_drugs or self._key(position) != key:
+            return None
+        _, _, first_mention, n_mentions = self._drug_entry(position)
+        block_offset = self.mentions_offset + first_mention * MENTION.size
+        rows = [MENTION.unpack_from(self.mm, block_offset + i * MENTION.size) for i in range(n_mentions)]
+        dates = tuple(date for date, _, _ in rows)
+        mentions = tuple(
+            (SOURCES[source], self._journal(journal_id), self.decode_date(date)) for date, source, journal_id in rows
+        )
+        return dates, mentions
+
+    def lookup(self, drug: str, start: str = None, end: str = None) -> list:
+        """
+        Returns where and when a drug was mentioned, optionally within a date range.
+
+        Args:
+            drug (str): Drug name, as stored in the staging tables.
+            start (str, optional): First date to keep, formatted as YYYY-MM-DD.
+            end (str, optional): Last date to keep, formatted as YYYY-MM-DD.
+
+        Returns:
+            list: Mentions as {"source", "name_journal", "date"} dicts sorted by date, None if the drug is unknown.
+        """
+        cached = self._cached_mentions(drug)
+        if cached is None:
+            return None
+        dates, mentions = cached
+        low = bisect_left(dates, self.parse_bound(start)) if start else 0
+        high = bisect_right(dates, self.parse_bound(end)) if end else len(mentions)
+        return [
+            {"source": source, "name_journal": name_journal, "date": date}
+            for source, name_journal, date in mentions[low:high]
+        ]
+
+    def search(self, prefix: str, limit: int = 100) -> list:
+        """Returns up to `limit` drug names starting with `prefix`, in sorted order."""
+        key = prefix.encode("utf-8")
+        position = self._find(key)
+        drugs = []
+        while position < self.n_drugs and len(drugs) < limit:
+            drug_key = self._key(position)
+            if not drug_key.startswith(key):
+                break
+            drugs.append(drug_key.decode("utf-8"))
+            position += 1
+        return drugs
+
+
+class DrugLookupHandler(BaseHTTPRequestHandler):
+    """
+    Serves a `DrugIndex` as JSON:
+        GET /drugs?prefix=dip&limit=10
+        GET /drugs/<drug>?start=2020-01-01&end=2020-12-31
+    """
+
+    index: DrugIndex = None
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = {name: values[0] for name, values in parse_qs(url.query).items()}
+        parts = [unquote(part) for part in url.path.strip("/").split("/")]
+        try:
+            if parts == ["drugs"]:
+                body = {"drugs": self.index.search(params.get("prefix", ""), int(params.get("limit", 100)))}
+            elif len(parts) == 2 and parts[0] == "drugs":
+                journals = self.index.lookup(parts[1], params.get("start"), params.get("end"))
+                if journals is None:
+                    return self._send_json(404, {"error": f"Unknown drug {parts[1]}"})
+                body = {"drug": parts[1], "journals": journals}
+            else:
+                return self._send_json(404, {"error": f"Unknown path {url.path}"})
+        except ValueError as e:
+            return self._send_json(400, {"error": str(e)})
+        self._send_json(200, body)
+
+    def _send_json(self, status: int, body: dict):
+        payload = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+def iso_date(date: str) -> str:
+    """argparse type for the YYYY-MM-DD date-range bounds."""
+    DrugIndex.parse_bound(date)
+    return date
+
+
+def serve(index: DrugIndex, host: str = "127.0.0.1", port: int = 8000) -> ThreadingHTTPServer:
+    handler = type("BoundDrugLookupHandler", (DrugLookupHandler,), {"index": index})
+    return ThreadingHTTPServer((host, port), handler)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Drug mentions lookup over a memory-mapped index.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    build_parser = commands.add_parser("build", help="Build the index from drug_json_result.json")
+    build_parser.add_argument("json_path")
+    build_parser.add_argument("index_path")
+
+    lookup_parser = commands.add_parser("lookup", help="Where and when a drug was mentioned")
+    lookup_parser.add_argument("index_path")
+    lookup_parser.add_argument("drug")
+    lookup_parser.add_argument("--start", type=iso_date, help="YYYY-MM-DD")
+    lookup_parser.add_argument("--end", type=iso_date, help="YYYY-MM-DD")
+
+    search_parser = commands.add_parser("search", help="Drugs starting with a prefix")
+    search_parser.add_argument("index_path")
+    search_parser.add_argument("prefix")
+    search_parser.add_argument("--limit", type=int, default=100)
+
+    serve_parser = commands.add_parser("serve", help="Local HTTP endpoint")
+    serve_parser.add_argument("index_path")
+    serve_parser.add_argument("--host", default="127.0.0.1")
+    serve_parser.add_argument("--port", type=int, default=8000)
+    serve_parser.add_argument("--cache-size", type=int, default=1024)
+
+    args = parser.parse_args()
+    if args.command == "build":
+        DrugIndex.build(DrugIndex.mentions_from_json_file(args.json_path), args.index_path)
+    elif args.command == "lookup":
+        with DrugIndex(args.index_path) as index:
+            journals = index.lookup(args.drug, args.start, args.end)
+        if journals is None:
+            parser.exit(1, f"Unknown drug {args.drug}\n")
+        print(json.dumps({"drug": args.drug, "journals": journals}))
+    elif args.command == "search":
+        with DrugIndex(args.index_path) as index:
+            print(json.dumps(index.search(args.prefix, args.limit)))
+    elif args.command == "serve":
+        with DrugIndex(args.index_path, args.cache_size) as index:
+            server = serve(index, args.host, args.port)
+            logger.info(f"Serving {args.index_path} on http://{args.host}:{args.port}")
+            try:
+                server.serve_forever()
+            except KeyboardInterrupt:
+                server.server_close()
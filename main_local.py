@@ -1,8 +1,13 @@
 from ingestion.gcp_ingestion import GCPIngestionPandas
+from ingestion.deduplication import PublicationDeduplicator
 from cleaning.gcp_cleaning import GCPCleaner, SearchDrugs
+from lookup.drug_index import DrugIndex
 import pandas as pd
 from google.cloud import bigquery
 import json 
+from pathlib import Path
+
+dedup_dir = Path("./data/dedup")
 
 def clear_table(project_id, data_set_id):
     print("clear tables")
@@ -17,6 +22,8 @@ def clear_table(project_id, data_set_id):
     for table_name in table_names:
         query = f"DELETE FROM `{project_id}.{data_set_id}.{table_name}` WHERE TRUE"
         client.query(query).result()
+        # Les hash déjà vus suivent les tables : on les vide en même temps
+        (dedup_dir / f"{table_name}.hashes").unlink(missing_ok=True)
 
 if __name__ == '__main__':
     project_id = 'sandbox-nbrami-sfeir'
@@ -34,9 +41,14 @@ if __name__ == '__main__':
         "sandbox-nbrami-sfeir-test-facto/pubmed.csv",
         ]
     gcp_ingestion_pd = GCPIngestionPandas(project_id)
+    # Dédoublonnage en streaming : pubmed.csv et pubmed.json partagent la même table donc le même seen-set
+    deduplicators = {
+        "clinical_trials": PublicationDeduplicator(dedup_dir / "clinical_trials.hashes", title_column="scientific_title"),
+        "pubmed": PublicationDeduplicator(dedup_dir / "pubmed.hashes"),
+    }
     for bucket_name in bucket_names:
         print("ingestion", bucket_name)
-        gcp_ingestion_pd.run(bucket_name, data_set_id)
+        gcp_ingestion_pd.run(bucket_name, data_set_id, deduplicator=deduplicators.get(Path(bucket_name).stem))
         print('\n\n\n')
     bucket_name = "sandbox-nbrami-sfeir-test-facto/pubmed.json"
     def custom_cleaning_function(df):
@@ -44,7 +56,7 @@ if __name__ == '__main__':
         df['date'] = pd.to_datetime(df['date'], format='%d/%m/%Y', errors='coerce').dt.strftime('%d/%m/%Y')
         return df
     print("ingestion", bucket_name)
-    gcp_ingestion_pd.run(bucket_name, data_set_id, custom_cleaning_function)
+    gcp_ingestion_pd.run(bucket_name, data_set_id, custom_cleaning_function, deduplicators["pubmed"])
     print('\n\n\n')
 
     #######2. **Code Python de Nettoyage** :
@@ -93,6 +105,8 @@ if __name__ == '__main__':
     
     with open("./data/drug_json_result.json", "w") as json_file:
         json.dump(drug_json, json_file)
+    # Index memory-mappé pour répondre à "où et quand le médicament X est cité" sans relire tout le JSON
+    DrugIndex.build(DrugIndex.mentions_from_search_results(drug_data), "./data/drug_index.bin")
     print("drug_json:", drug_json)
     print('\n\n\n')
     print('\n\n\n')
@@ -0,0 +1,136 @@
+import os
+import tempfile
+import unittest
+import pandas as pd
+from ingestion.deduplication import PublicationDeduplicator, SortedHashStore
+
+class TestPublicationDeduplicator(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.seen_path = os.path.join(self.tmp_dir.name, 'pubmed.hashes')
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_drops_empty_titles_and_duplicates(self):
+        df = pd.DataFrame({
+            'id': [1, '1', 2, 3],
+            'title': [' Aspirin helps ', 'aspirin   HELPS', '  ', 'Ibuprofen'],
+            'date': ['01/02/2020', '1 February 2020', '01/02/2020', '01/02/2020'],
+            'journal': ['Journal B', 'journal b', 'Journal B', 'Journal B']
+        })
+
+        result = PublicationDeduplicator(self.seen_path).deduplicate(df)
+
+        self.assertEqual(list(result['title']), [' Aspirin helps ', 'Ibuprofen'])
+
+    def test_seen_set_persists_across_runs(self):
+        df = pd.DataFrame({
+            'id': [1],
+            'title': ['Aspirin helps'],
+            'date': ['01/02/2020'],
+            'journal': ['Journal B']
+        })
+
+        first_run = PublicationDeduplicator(self.seen_path)
+        self.assertEqual(len(first_run.deduplicate(df)), 1)
+        first_run.commit()
+
+        second_run = PublicationDeduplicator(self.seen_path)
+        self.assertEqual(len(second_run.deduplicate(df)), 0)
+
+    def test_rollback_forgets_uncommitted_hashes(self):
+        df = pd.DataFrame({
+            'id': [1],
+            'title': ['Aspirin helps'],
+            'date': ['01/02/2020'],
+            'journal': ['Journal B']
+        })
+
+        deduplicator = PublicationDeduplicator(self.seen_path)
+        deduplicator.deduplicate(df)
+        deduplicator.rollback()
+
+        self.assertEqual(len(deduplicator.deduplicate(df)), 1)
+        self.assertFalse(os.path.exists(self.seen_path))
+
+    def test_clinical_trials_title_column(self):
+        df = pd.read_csv('data/clinical_trials.csv')
+
+        result = PublicationDeduplicator(title_column='scientific_title').deduplicate(df)
+
+        # The blank title is dropped, the repeated "Glucagon Infusion..." trial is kept once
+        self.assertEqual(len(result), len(df) - 2)
+        self.assertTrue(result['scientific_title'].str.strip().astype(bool).all())
+        glucagon = result[result['scientific_title'].str.startswith('Glucagon Infusion')]
+        self.assertEqual(len(glucagon), 1)
+        # The kept trial gets the journal of the dropped duplicate
+        self.assertEqual(glucagon['id'].iloc[0], 'NCT03490942')
+        self.assertEqual(glucagon['journal'].iloc[0], 'Journal of emergency nursing')
+
+    def test_complete_row_wins_over_earlier_incomplete_row(self):
+        df = pd.DataFrame({
+            'id': ['', '1'],
+            'title': ['Aspirin helps', 'Aspirin helps'],
+            'date': ['01/02/2020', '01/02/2020'],
+            'journal': ['Journal B', 'Journal B']
+        })
+
+        result = PublicationDeduplicator().deduplicate(df)
+
+        self.assertEqual(list(result['id']), ['1'])
+
+    def test_complete_row_kept_after_incomplete_row_of_previous_run(self):
+        incomplete = pd.DataFrame({'id': [''], 'title': ['Aspirin helps'], 'date': ['01/02/2020'], 'journal': ['Journal B']})
+        complete = incomplete.assign(id=['1'])
+        first_run = PublicationDeduplicator(self.seen_path)
+        first_run.deduplicate(incomplete)
+        first_run.commit()
+
+        second_run = PublicationDeduplicator(self.seen_path)
+
+        self.assertEqual(list(second_run.deduplicate(complete)['id']), ['1'])
+        self.assertEqual(len(second_run.deduplicate(incomplete)), 0)
+
+    def test_empty_id_or_journal_is_a_wildcard(self):
+        df = pd.DataFrame({
+            'id': ['1', '', '2', '3'],
+            'title': ['Aspirin helps', 'Aspirin helps', 'Aspirin helps', 'Aspirin helps'],
+            'date': ['01/02/2020', '01/02/2020', '01/02/2020', '02/02/2020'],
+            'journal': ['Journal B', 'Journal B', 'Journal C', '']
+        })
+
+        result = PublicationDeduplicator().deduplicate(df)
+
+        self.assertEqual(list(result['id']), ['1', '2', '3'])
+
+    def test_iter_unique_streams_records(self):
+        records = iter([
+            {'id': 9, 'title': 'Aspirin helps', 'date': '01/01/2020', 'journal': 'Journal B'},
+            {'id': '9', 'title': 'aspirin helps', 'date': '1 January 2020', 'journal': 'Journal B'},
+            {'id': 10, 'title': '', 'date': '01/01/2020', 'journal': 'Journal B'},
+            {'id': 11, 'title': 'Ibuprofen', 'journal': 'Journal B'},
+        ])
+
+        result = list(PublicationDeduplicator().iter_unique(records))
+
+        self.assertEqual([record['id'] for record in result], [9, 11])
+
+class TestSortedHashStore(unittest.TestCase):
+
+    def test_add_all_keeps_hashes_sorted_and_unique(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'seen.hashes')
+            store = SortedHashStore(path)
+            store.add_all([5, 2**64 - 1, 3])
+            store.add_all([3, 1])
+
+            reloaded = SortedHashStore(path)
+
+            self.assertEqual(list(reloaded.hashes), [1, 3, 5, 2**64 - 1])
+            self.assertIn(2**64 - 1, reloaded)
+            self.assertNotIn(4, reloaded)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,110 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import unittest
+from urllib.request import urlopen
+from lookup.drug_index import DrugIndex, serve
+
+class TestDrugIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.index_path = os.path.join(self.tmp_dir.name, 'drug_index.bin')
+        drug_data = [
+            {'aspirin': {('clinical', 'journal a', '01-01-2020'), ('pubmed', 'journal b', '01-02-2019')}},
+            {'atropine': {('pubmed', 'journal a', '03-01-2020')}},
+            {'ibuprofen': set()},
+        ]
+        DrugIndex.build(DrugIndex.mentions_from_search_results(drug_data), self.index_path)
+        self.index = DrugIndex(self.index_path)
+
+    def tearDown(self):
+        self.index.close()
+        self.tmp_dir.cleanup()
+
+    def test_lookup_sorted_by_date(self):
+        result = self.index.lookup('aspirin')
+
+        expected_result = [
+            {'source': 'pubmed', 'name_journal': 'journal b', 'date': '01-02-2019'},
+            {'source': 'clinical', 'name_journal': 'journal a', 'date': '01-01-2020'},
+        ]
+        self.assertEqual(result, expected_result)
+        self.assertEqual(self.index.lookup('ibuprofen'), [])
+        self.assertIsNone(self.index.lookup('unknown'))
+
+    def test_lookup_date_range(self):
+        result = self.index.lookup('aspirin', start='2019-06-01', end='2020-01-01')
+
+        self.assertEqual([mention['date'] for mention in result], ['01-01-2020'])
+
+    def test_hot_drug_decoded_once(self):
+        self.index.lookup('aspirin')
+        self.index.lookup('aspirin', start='2020-01-01')
+
+        self.assertEqual(self.index._cached_mentions.cache_info().hits, 1)
+
+    def test_cli_rejects_bad_dates_and_unknown_drugs(self):
+        def run_cli(*args):
+            return subprocess.run([sys.executable, '-m', 'lookup.drug_index', 'lookup', self.index_path, *args],
+                                  capture_output=True, text=True)
+
+        self.assertEqual(run_cli('aspirin', '--start', '2020-01-01').returncode, 0)
+        bad_date = run_cli('aspirin', '--start', '03/01/2020')
+        self.assertEqual(bad_date.returncode, 2)
+        self.assertNotIn('Traceback', bad_date.stderr)
+        unknown = run_cli('unknown')
+        self.assertEqual(unknown.returncode, 1)
+        self.assertIn('Unknown drug unknown', unknown.stderr)
+
+    def test_build_with_missing_journal(self):
+        index_path = os.path.join(self.tmp_dir.name, 'nan_index.bin')
+        drug_data = [{'glucagon': {
+            ('clinical', float('nan'), '05-25-2020'),
+            ('clinical', 'journal of emergency nursing', '05-25-2020'),
+            ('pubmed', None, float('nan')),
+        }}]
+
+        DrugIndex.build(DrugIndex.mentions_from_search_results(drug_data), index_path)
+
+        with DrugIndex(index_path) as index:
+            result = index.lookup('glucagon')
+        self.assertEqual(result, [
+            {'source': 'pubmed', 'name_journal': '', 'date': ''},
+            {'source': 'clinical', 'name_journal': '', 'date': '05-25-2020'},
+            {'source': 'clinical', 'name_journal': 'journal of emergency nursing', 'date': '05-25-2020'},
+        ])
+
+    def test_prefix_search(self):
+        self.assertEqual(self.index.search('a'), ['aspirin', 'atropine'])
+        self.assertEqual(self.index.search('a', limit=1), ['aspirin'])
+        self.assertEqual(self.index.search('z'), [])
+
+    def test_build_from_json_result(self):
+        index_path = os.path.join(self.tmp_dir.name, 'json_index.bin')
+        DrugIndex.build(DrugIndex.mentions_from_json_file('data/drug_json_result.json'), index_path)
+
+        with DrugIndex(index_path) as index:
+            result = index.lookup('diphenhydramine', end='2019-12-31')
+
+        self.assertEqual([mention['name_journal'] for mention in result],
+                         ['journal of emergency nursing', 'the journal of pediatrics'])
+
+    def test_http_endpoint(self):
+        server = serve(self.index, port=0)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        base_url = f'http://127.0.0.1:{server.server_address[1]}'
+        try:
+            with urlopen(f'{base_url}/drugs?prefix=at') as response:
+                self.assertEqual(json.load(response), {'drugs': ['atropine']})
+            with urlopen(f'{base_url}/drugs/atropine?start=2020-01-01') as response:
+                self.assertEqual(json.load(response)['journals'][0]['name_journal'], 'journal a')
+        finally:
+            server.shutdown()
+            server.server_close()
+
+if __name__ == '__main__':
+    unittest.main()
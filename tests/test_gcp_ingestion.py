@@ -0,0 +1,61 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+import pandas as pd
+from ingestion.deduplication import PublicationDeduplicator
+from ingestion.gcp_ingestion import GCPIngestionPandas
+
+class TestGCPIngestionPandasDeduplication(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.seen_path = os.path.join(self.tmp_dir.name, 'pubmed.hashes')
+        self.df = pd.DataFrame({
+            'id': [1, 1],
+            'title': ['Aspirin helps', 'Aspirin helps'],
+            'date': ['01/02/2020', '01/02/2020'],
+            'journal': ['Journal B', 'Journal B']
+        })
+        for target in ('storage.Client', 'bigquery.Client'):
+            patcher = patch(f'ingestion.gcp_ingestion.{target}')
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.ingestion = GCPIngestionPandas('test_project')
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    @patch('ingestion.gcp_ingestion.GCPIngestionPandas._move_file')
+    @patch('ingestion.gcp_ingestion.GCPIngestionPandas.load_into_bigquery')
+    @patch('ingestion.gcp_ingestion.GCPIngestionPandas.load_from_bucket')
+    def test_commit_after_successful_load(self, mock_load_from_bucket, mock_load_into_bigquery, mock_move_file):
+        mock_load_from_bucket.return_value = self.df
+        def assert_not_persisted_yet(df, dataset_id, table_id):
+            self.assertEqual(len(df), 1)
+            self.assertFalse(os.path.exists(self.seen_path))
+        mock_load_into_bigquery.side_effect = assert_not_persisted_yet
+        deduplicator = PublicationDeduplicator(self.seen_path)
+
+        self.ingestion.run('bucket/pubmed.csv', 'test_dataset', deduplicator=deduplicator)
+
+        mock_load_into_bigquery.assert_called_once()
+        self.assertEqual(len(PublicationDeduplicator(self.seen_path).deduplicate(self.df)), 0)
+        mock_move_file.assert_called_once_with('bucket', 'pubmed.csv', 'bucket-archive', archive=True)
+
+    @patch('ingestion.gcp_ingestion.GCPIngestionPandas._move_file')
+    @patch('ingestion.gcp_ingestion.GCPIngestionPandas.load_into_bigquery')
+    @patch('ingestion.gcp_ingestion.GCPIngestionPandas.load_from_bucket')
+    def test_rollback_when_load_fails(self, mock_load_from_bucket, mock_load_into_bigquery, mock_move_file):
+        mock_load_from_bucket.return_value = self.df
+        mock_load_into_bigquery.side_effect = RuntimeError('load failed')
+        deduplicator = PublicationDeduplicator(self.seen_path)
+
+        self.ingestion.run('bucket/pubmed.csv', 'test_dataset', deduplicator=deduplicator)
+
+        self.assertFalse(os.path.exists(self.seen_path))
+        self.assertEqual(deduplicator.pending, set())
+        mock_move_file.assert_called_once_with('bucket', 'pubmed.csv', 'bucket-errors', archive=False)
+
+if __name__ == '__main__':
+    unittest.main()
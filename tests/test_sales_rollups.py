@@ -0,0 +1,178 @@
+import datetime
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+import pandas as pd
+from google.cloud.bigquery import SchemaField
+from google.cloud.bigquery._pandas_helpers import dataframe_to_arrow
+from pandas_gbq.schema import generate_bq_schema, update_schema
+from cleaning.sales_rollups import LocalSalesRollups, SalesRollups
+
+class TestSalesRollups(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.transactions = pd.DataFrame({
+            'date': ['2019-01-01', '2019-01-01', '2019-01-02', '2019-01-03', '2019-01-03'],
+            'order_id': [1, 2, 3, 4, 5],
+            'client_id': [10, 20, 10, 20, 30],
+            'prod_id': [100, 200, 200, 100, 300],
+            'prod_price': [5.0, 10.0, 10.0, 5.0, 7.0],
+            'prod_qty': [2, 1, 3, 1, 1]
+        })
+        pd.DataFrame({
+            'product_type': ['MEUBLE', 'DECO', 'AUTRE'],
+            'product_id': [100, 200, 300],
+            'product_name': ['Chaise', 'Boule', 'Autre']
+        }).to_csv(os.path.join(self.tmp_dir.name, 'product.csv'), index=False)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def write_transactions(self, transactions):
+        transactions.to_csv(os.path.join(self.tmp_dir.name, 'transaction.csv'), index=False)
+
+    def client_watermark(self):
+        rollups = LocalSalesRollups(self.tmp_dir.name)
+        return rollups.watermark(rollups.load_rollup('client_sales_watermark'), 'watermark')
+
+    def test_full_run(self):
+        self.write_transactions(self.transactions)
+
+        daily, clients = LocalSalesRollups(self.tmp_dir.name).run()
+
+        self.assertEqual(list(daily['ventes']), [20.0, 30.0, 12.0])
+        self.assertEqual(daily['date'][0], datetime.date(2019, 1, 1))
+        self.assertEqual(list(clients['client_id']), [10, 20, 30])
+        self.assertEqual(list(clients['ventes_meuble']), [10.0, 5.0, 0.0])
+        self.assertEqual(list(clients['ventes_deco']), [30.0, 10.0, 0.0])
+
+    def test_incremental_run_matches_full_refresh(self):
+        self.write_transactions(self.transactions.iloc[:2])
+        rollups = LocalSalesRollups(self.tmp_dir.name)
+        rollups.run()
+
+        self.write_transactions(self.transactions)
+        daily, clients = LocalSalesRollups(self.tmp_dir.name).run()
+        full_daily, full_clients = LocalSalesRollups(self.tmp_dir.name).run(full_refresh=True)
+
+        pd.testing.assert_frame_equal(daily, full_daily)
+        pd.testing.assert_frame_equal(clients, full_clients)
+        self.assertEqual(self.client_watermark(), datetime.date(2019, 1, 3))
+
+    def test_run_without_new_transactions_is_idempotent(self):
+        self.write_transactions(self.transactions)
+        LocalSalesRollups(self.tmp_dir.name).run()
+
+        daily, clients = LocalSalesRollups(self.tmp_dir.name).run()
+
+        self.assertEqual(list(daily['ventes']), [20.0, 30.0, 12.0])
+        self.assertEqual(daily['date'][0], datetime.date(2019, 1, 1))
+        self.assertEqual(list(clients['ventes_deco']), [30.0, 10.0, 0.0])
+        self.assertEqual(self.client_watermark(), datetime.date(2019, 1, 3))
+
+    def test_matches_hand_computed_exo_sql(self):
+        out_of_range = pd.DataFrame({
+            'date': ['2018-12-31', '2031-01-01'],
+            'order_id': [6, 7],
+            'client_id': [10, 40],
+            'prod_id': [100, 200],
+            'prod_price': [100.0, 50.0],
+            'prod_qty': [1, 2]
+        })
+        self.write_transactions(pd.concat([out_of_range.iloc[:1], self.transactions, out_of_range.iloc[1:]]))
+
+        daily, clients = LocalSalesRollups(self.tmp_dir.name).run()
+
+        # exo 1: date BETWEEN '2019-01-01' AND '2019-12-31', filtered on the rollup date dimension
+        exo_1 = daily[daily['date'].between(datetime.date(2019, 1, 1), datetime.date(2019, 12, 31))]
+        self.assertEqual(list(exo_1['date']), [datetime.date(2019, 1, d) for d in (1, 2, 3)])
+        self.assertEqual(list(exo_1['ventes']), [5.0 * 2 + 10.0, 10.0 * 3, 5.0 + 7.0])
+        # exo 2: the 2018 and 2031 transactions are outside the bounds, client 40 is never seen
+        self.assertEqual(list(clients['client_id']), [10, 20, 30])
+        self.assertEqual(list(clients['ventes_meuble']), [5.0 * 2, 5.0, 0.0])
+        self.assertEqual(list(clients['ventes_deco']), [10.0 * 3, 10.0, 0.0])
+
+    def test_out_of_range_transaction_after_watermark_is_not_counted_in_client_sales(self):
+        self.write_transactions(self.transactions)
+        LocalSalesRollups(self.tmp_dir.name).run()
+        late = pd.DataFrame({
+            'date': ['2031-01-01'],
+            'order_id': [8],
+            'client_id': [10],
+            'prod_id': [200],
+            'prod_price': [10.0],
+            'prod_qty': [1]
+        })
+        self.write_transactions(pd.concat([self.transactions, late]))
+
+        daily, clients = LocalSalesRollups(self.tmp_dir.name).run()
+
+        self.assertEqual(list(clients['ventes_deco']), [30.0, 10.0, 0.0])
+        self.assertEqual(self.client_watermark(), datetime.date(2031, 1, 1))
+        self.assertEqual(daily['date'].max(), datetime.date(2031, 1, 1))
+
+    def test_watermark_survives_empty_client_rollup(self):
+        self.write_transactions(self.transactions.assign(date='2018-06-01'))
+        LocalSalesRollups(self.tmp_dir.name).run()
+        rollups = LocalSalesRollups(self.tmp_dir.name)
+
+        with patch.object(LocalSalesRollups, 'load_new_transactions', wraps=rollups.load_new_transactions) as spy:
+            daily, clients = rollups.run()
+
+        self.assertTrue(clients.empty)
+        self.assertEqual(self.client_watermark(), datetime.date(2018, 6, 1))
+        spy.assert_called_once_with(datetime.date(2018, 6, 1))
+
+    def test_full_refresh_with_empty_source_writes_empty_rollups(self):
+        self.write_transactions(self.transactions)
+        rollups = LocalSalesRollups(self.tmp_dir.name)
+        rollups.run()
+        self.write_transactions(self.transactions.iloc[:0])
+
+        daily, clients = rollups.run(full_refresh=True)
+
+        self.assertTrue(daily.empty)
+        self.assertTrue(clients.empty)
+        self.assertTrue(pd.read_csv(rollups.table('daily_sales')).empty)
+        self.assertTrue(pd.read_csv(rollups.table('client_sales')).empty)
+        self.assertIsNone(self.client_watermark())
+
+    def test_load_rollup_missing_local_file(self):
+        self.assertIsNone(LocalSalesRollups(self.tmp_dir.name).load_rollup('daily_sales'))
+
+    @patch('cleaning.gcp_cleaning.bigquery.Client')
+    def test_load_new_transactions_after_watermark(self, mock_bigquery_client):
+        mock_query = mock_bigquery_client.return_value.query
+
+        SalesRollups('test_project', 'test_dataset').load_new_transactions(datetime.date(2019, 1, 3))
+
+        mock_query.assert_called_once_with("SELECT * FROM `test_dataset.transaction` WHERE date > '2019-01-03'")
+
+    @patch('cleaning.gcp_cleaning.to_gbq')
+    @patch('cleaning.gcp_cleaning.bigquery.Client')
+    def test_rollups_stored_with_date_columns(self, mock_bigquery_client, mock_to_gbq):
+        rollups = SalesRollups('test_project', 'test_dataset')
+        products = pd.read_csv(os.path.join(self.tmp_dir.name, 'product.csv'))
+
+        with patch.object(SalesRollups, 'load_rollup', return_value=None), \
+                patch.object(SalesRollups, 'load_new_transactions', return_value=self.transactions.copy()), \
+                patch.object(SalesRollups, 'load_from_bigquery', return_value=products):
+            rollups.run()
+
+        stored = {call.kwargs['destination_table']: call for call in mock_to_gbq.call_args_list}
+        self.assertEqual(set(stored), {'test_dataset.daily_sales', 'test_dataset.client_sales',
+                                       'test_dataset.client_sales_watermark'})
+        for table, column in (('test_dataset.daily_sales', 'date'), ('test_dataset.client_sales_watermark', 'watermark')):
+            df = stored[table].args[0]
+            self.assertEqual(str(df[column].dtype), 'dbdate')
+            self.assertEqual(stored[table].kwargs['table_schema'], [{'name': column, 'type': 'DATE'}])
+            # The conversion the BigQuery load job runs on the frame
+            fields = update_schema(generate_bq_schema(df), {'fields': stored[table].kwargs['table_schema']})['fields']
+            arrow_table = dataframe_to_arrow(df, [SchemaField(field['name'], field['type']) for field in fields])
+            self.assertEqual(str(arrow_table.schema.field(column).type), 'date32[day]')
+        self.assertNotIn('table_schema', stored['test_dataset.client_sales'].kwargs)
+
+if __name__ == '__main__':
+    unittest.main()